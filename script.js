@@ -99,9 +99,8 @@ class SubdomainDashboard {
         } else {
             apiBase = `${window.location.origin}/api`;
         }
-        this.crtApiBase = `${apiBase}/crt`;
+        this.enumApiBase = `${apiBase}/enum`;
         this.metaApiBase = `${apiBase}/meta`;
-        this.waybackApiBase = `${apiBase}/wayback`;
         this.subfinderApiBase = `${apiBase}/subfinder`;
         this.monitorApiBase = `${apiBase}/monitor`;
         this.monitorUpdatesApi = `${apiBase}/monitor/updates`;
@@ -326,19 +325,17 @@ class SubdomainDashboard {
         this.hideResults();
 
         try {
-            const [crtRes, wbRes, sfRes, monitorRes] = await Promise.allSettled([
-                this.fetchSubdomainsFromCrtSh(domain),
-                this.fetchSubdomainsFromWayback(domain),
+            const [enumRes, sfRes, monitorRes] = await Promise.allSettled([
+                this.fetchSubdomainsFromEnum(domain),
                 this.fetchSubdomainsFromSubfinder(domain),
                 this.fetchMonitorStatus(domain),
             ]);
 
-            const crtList = crtRes.status === 'fulfilled' ? crtRes.value : [];
-            const wbList = wbRes.status === 'fulfilled' ? wbRes.value : [];
+            const enumList = enumRes.status === 'fulfilled' ? enumRes.value : [];
             const sfList = sfRes.status === 'fulfilled' ? sfRes.value : [];
             this.monitorStatus = monitorRes.status === 'fulfilled' ? monitorRes.value : null;
 
-            const finalSubdomains = Array.from(new Set([...crtList, ...wbList, ...sfList])).sort();
+            const finalSubdomains = Array.from(new Set([...enumList, ...sfList])).sort();
             if (finalSubdomains.length === 0) throw new Error('No subdomains found from crt.sh, Wayback, or Subfinder');
 
             this.displayResults(finalSubdomains);
@@ -396,33 +393,14 @@ class SubdomainDashboard {
         }
     }
 
-    async fetchSubdomainsFromCrtSh(domain) {
+    // crt.sh + Wayback, fetched concurrently and merged server-side
+    async fetchSubdomainsFromEnum(domain) {
         try {
-            const url = `${this.crtApiBase}?domain=${encodeURIComponent(domain)}`;
+            const url = `${this.enumApiBase}?domain=${encodeURIComponent(domain)}`;
             const response = await fetch(url, { method: 'GET', headers: { 'Accept': 'application/json' }});
             if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
             const data = await response.json();
-            if (!Array.isArray(data)) throw new Error('Invalid response format from crt.sh');
-            const set = new Set();
-            data.forEach(cert => {
-                if (cert.name_value) {
-                    cert.name_value.split('\n').forEach(name => {
-                        const n = name.trim().toLowerCase();
-                        if (n.endsWith(`.${domain}`) || n === domain) set.add(n);
-                    });
-                }
-            });
-            return Array.from(set).sort();
-        } catch (e) { return []; }
-    }
-
-    async fetchSubdomainsFromWayback(domain) {
-        try {
-            const url = `${this.waybackApiBase}?domain=${encodeURIComponent(domain)}`;
-            const response = await fetch(url, { method: 'GET', headers: { 'Accept': 'application/json' }});
-            if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
-            const data = await response.json();
-            if (!Array.isArray(data)) throw new Error('Invalid response format from Wayback');
+            if (!Array.isArray(data)) throw new Error('Invalid response format from enum API');
             const n = data.filter(Boolean).map(s => String(s).trim().toLowerCase());
             return Array.from(new Set(n.filter(s => s.endsWith(`.${domain}`) || s === domain))).sort();
         } catch (e) { return []; }
@@ -5,9 +5,10 @@ Backend server for subdomain enumeration and monitoring
 Features:
 - Basic Authentication (credentials from auth.json or AUTH_FILE)
 - Subdomain discovery sources:
-  - crt.sh via /api/crt
+  - crt.sh via /api/crt (raw crt.sh JSON; add dedup=1 for a sorted hostname list)
   - Wayback Machine (CDX) via /api/wayback
   - Subfinder via /api/subfinder (optional; requires subfinder installed)
+  - crt.sh + Wayback fetched concurrently and merged via /api/enum
 - HTTP metadata (status/title) via /api/meta
   - Includes passive fingerprinting: technologies inferred from headers/HTML
 - Monitoring automation:
@@ -23,45 +24,155 @@ Environment:
 - REQUIRE_AUTH (default: "true" if AUTH_FILE exists, otherwise "false")
 - SUBFINDER_BIN (default: "subfinder")
 - SUBFINDER_TIMEOUT (default: "45" seconds)
+- SUBFINDER_TTL (default: "600" seconds; reuse subfinder results per domain, 0 disables)
+- UPSTREAM_TIMEOUT (default: "60" seconds; crt.sh / Wayback requests)
+- UPSTREAM_CONNECT_TIMEOUT (default: "10" seconds; TCP/TLS connect to crt.sh / Wayback)
+- UPSTREAM_MAX_INFLIGHT (default: "32"; concurrent crt/wayback/subfinder/enum requests before 503)
+- CACHE_TTL (default: "900" seconds; reuse crt.sh / Wayback results per domain, 0 disables)
+- META_CONCURRENCY (default: "32"; max simultaneous /api/meta probes, server-wide)
+- META_PER_DOMAIN (default: "0" = off; max simultaneous probes per registered domain in a batch)
 """
 
 import json
+import codecs
 import urllib.request
 import urllib.parse
 from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
-from urllib.parse import parse_qs, urlparse
+from urllib.parse import parse_qsl, urlparse
 import ssl
+import socket
 import os
+import stat
 import mimetypes
+import gzip
+import zlib
 import subprocess
 import shutil
 import threading
 import time
+import bisect
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
 from datetime import datetime, timezone, timedelta
+from functools import lru_cache
 
 # New imports for metadata fetching with httpx
 import re
 import html
+import email.utils
 import asyncio
-from typing import List, Dict, Any, Optional
+import importlib.util
+from typing import List, Dict, Any, Optional, Tuple
 
 try:
     import httpx  # Ensure dependency installed: pip install httpx
 except ImportError:
     httpx = None
 
+# httpx only speaks HTTP/2 when the optional h2 package is installed
+# (pip install 'httpx[http2]'); without it, clients stay on HTTP/1.1.
+HTTP2_AVAILABLE = httpx is not None and importlib.util.find_spec("h2") is not None
+
+try:
+    import orjson  # Optional: faster JSON encoding for large result lists
+except ImportError:
+    orjson = None
+
+try:
+    import uvloop  # Optional: faster event loop for the /api/meta probes
+except ImportError:
+    uvloop = None
+
 # ---------- Utilities ----------
 ISO = "%Y-%m-%dT%H:%M:%SZ"
 
 
+_now_iso_cache = (0, "")
+
+
 def now_iso() -> str:
-    return datetime.now(timezone.utc).strftime(ISO)
+    # Formatted at most once per second; every /api/meta result stamps one.
+    global _now_iso_cache
+    t = int(time.time())
+    cached_t, cached = _now_iso_cache
+    if cached_t != t:
+        cached = time.strftime(ISO, time.gmtime(t))
+        _now_iso_cache = (t, cached)
+    return cached
 
 
 def parse_iso(ts: str) -> datetime:
     return datetime.strptime(ts, ISO).replace(tzinfo=timezone.utc)
 
 
+def json_bytes(obj) -> bytes:
+    """Serialize obj to compact UTF-8 JSON, using orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def json_loads(data: bytes):
+    """Parse UTF-8 JSON straight from bytes, using orjson when available."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+JSON_WS_RE = re.compile(r'[ \t\n\r]*')
+_json_decoder = json.JSONDecoder()
+NUMBER_TAIL_CHARS = frozenset('0123456789.eE+-')
+
+
+def iter_json_array(chunks):
+    """Yield the elements of a top-level JSON array from UTF-8 byte chunks.
+
+    Elements are decoded as soon as they are complete, so neither the whole
+    document nor the full list of decoded elements ever exists at once.
+    Raises ValueError on malformed or truncated input, after yielding every
+    element that came before the problem.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')('ignore')
+    chunks = iter(chunks)
+    buf, idx = '', 0
+    expect = '['  # then 'first' (element or ']'), 'sep' (',' or ']'), 'item'
+    while True:
+        idx = JSON_WS_RE.match(buf, idx).end()
+        if idx < len(buf):
+            ch = buf[idx]
+            if expect == '[':
+                if ch != '[':
+                    raise ValueError("Expected a JSON array")
+                idx += 1
+                expect = 'first'
+                continue
+            if ch == ']' and expect in ('first', 'sep'):
+                return
+            if expect == 'sep':
+                if ch != ',':
+                    raise ValueError("Malformed JSON array")
+                idx += 1
+                expect = 'item'
+                continue
+            try:
+                item, end = _json_decoder.raw_decode(buf, idx)
+            except ValueError:
+                end = None
+            # An element that runs to the end of the buffer may continue in
+            # the next chunk: a string cut in half, or a number like "2." or
+            # "1e" that raw_decode would otherwise accept as just its digits.
+            if end is not None and end < len(buf) and buf[end] not in NUMBER_TAIL_CHARS:
+                yield item
+                idx = end
+                expect = 'sep'
+                continue
+        chunk = next(chunks, None)
+        if chunk is None:
+            raise ValueError("Malformed or truncated JSON array")
+        buf = buf[idx:] + decoder.decode(chunk)
+        idx = 0
+
+
 def load_json(path: str, default):
     try:
         if os.path.isfile(path):
@@ -79,6 +190,137 @@ def save_json(path: str, data) -> None:
     os.replace(tmp, path)
 
 
+def query_param(query: str, name: str) -> str:
+    """First value of `name` in a URL query string, or '' if absent."""
+    for key, value in parse_qsl(query):
+        if key == name:
+            return value
+    return ''
+
+
+def parse_accept_encoding(value: Optional[str]) -> Dict[str, float]:
+    """Map each content-coding in an Accept-Encoding header to its q-value."""
+    prefs: Dict[str, float] = {}
+    for item in (value or '').split(','):
+        coding, _, params = item.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            name, _, val = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(val)
+                except ValueError:
+                    q = 0.0
+        prefs[coding] = q
+    return prefs
+
+
+class TTLCache:
+    """Small thread-safe in-memory cache whose entries expire after `ttl` seconds."""
+
+    def __init__(self, ttl: float, max_entries: int = 256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._data: Dict[Any, Any] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key, value) -> None:
+        if self.ttl <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if len(self._data) >= self.max_entries:
+                self._data = {k: v for k, v in self._data.items() if v[0] > now}
+                while len(self._data) >= self.max_entries:
+                    self._data.pop(next(iter(self._data)))
+            self._data[key] = (now + self.ttl, value)
+
+
+# ---------- Upstream HTTP ----------
+# crt.sh and the Wayback CDX API are hit repeatedly (UI searches + monitor
+# rescans). A shared pooled client keeps TCP/TLS connections alive between
+# calls instead of paying a fresh handshake on every request.
+UPSTREAM_TIMEOUT = float(os.environ.get("UPSTREAM_TIMEOUT", "60"))
+# A host that doesn't accept the TCP connection quickly is not going to;
+# fail those fast instead of holding a handler thread for UPSTREAM_TIMEOUT.
+UPSTREAM_CONNECT_TIMEOUT = min(UPSTREAM_TIMEOUT, float(os.environ.get("UPSTREAM_CONNECT_TIMEOUT", "10")))
+# Client requests allowed to wait on crt.sh / Wayback / subfinder at once;
+# beyond that new ones get 503 rather than queueing behind a stalled upstream.
+UPSTREAM_MAX_INFLIGHT = max(1, int(os.environ.get("UPSTREAM_MAX_INFLIGHT", "32")))
+
+# Built once: creating a context loads and parses the system CA bundle.
+# Used by the upstream clients only; /api/meta has META_SSL_CONTEXT.
+SSL_CONTEXT = ssl.create_default_context()
+
+if httpx is not None:
+    _upstream_client = httpx.Client(
+        follow_redirects=True,
+        timeout=httpx.Timeout(UPSTREAM_TIMEOUT, connect=UPSTREAM_CONNECT_TIMEOUT),
+        # retries=1 re-dials once on a failed connect (transient DNS/TCP
+        # errors); requests that already reached the server are not replayed.
+        transport=httpx.HTTPTransport(
+            verify=SSL_CONTEXT,
+            retries=1,
+            limits=httpx.Limits(max_keepalive_connections=32, max_connections=64),
+        ),
+    )
+else:
+    _upstream_client = None
+
+
+def upstream_get(url: str) -> bytes:
+    """GET url and return the raw body; raises on transport or HTTP errors."""
+    if _upstream_client is not None:
+        resp = _upstream_client.get(url)
+        resp.raise_for_status()
+        return resp.content
+    with urllib.request.urlopen(url, context=SSL_CONTEXT, timeout=UPSTREAM_TIMEOUT) as response:
+        return response.read()
+
+
+def iter_lines(chunks):
+    """Yield newline-separated lines from an iterable of byte chunks."""
+    tail = b''
+    for chunk in chunks:
+        if tail:
+            chunk = tail + chunk
+        lines = chunk.split(b'\n')
+        tail = lines.pop()
+        yield from lines
+    if tail:
+        yield tail
+
+
+@contextmanager
+def upstream_stream(url: str, chunk_size: int = 64 * 1024):
+    """Like upstream_get, but yields an iterator over body chunks.
+
+    Transport and HTTP status errors are raised on entry, before any chunk
+    is produced, so callers can still fall back to an error response.
+    """
+    if _upstream_client is not None:
+        with _upstream_client.stream("GET", url) as resp:
+            resp.raise_for_status()
+            yield resp.iter_bytes(chunk_size)
+        return
+    with urllib.request.urlopen(url, context=SSL_CONTEXT, timeout=UPSTREAM_TIMEOUT) as response:
+        yield iter(lambda: response.read(chunk_size), b'')
+
+
 # ---------- Auth Manager ----------
 class AuthManager:
     def __init__(self):
@@ -114,7 +356,11 @@ class MonitorManager:
         self.file_path = os.path.abspath("monitors.json")
         self.state = load_json(self.file_path, {"monitors": {}})
         self.recent_events: List[Dict[str, Any]] = []
+        # Epoch seconds of recent_events, same order, for bisecting in get_events_since.
+        self.recent_ts: List[float] = []
         self.recent_lock = threading.Lock()
+        # Guards self.state between API handlers and the monitor thread.
+        self.state_lock = threading.RLock()
         self.handler_cls = handler_cls_ref
         self.stop_event = threading.Event()
         self.thread = threading.Thread(target=self._runner, daemon=True)
@@ -128,67 +374,66 @@ class MonitorManager:
 
     def set_monitor(self, domain: str, enabled: bool, interval_hours: Optional[int] = None) -> Dict[str, Any]:
         domain = domain.strip().lower()
-        m = self.state.setdefault("monitors", {}).get(domain, {
-            "enabled": False,
-            "interval_hours": 12,
-            "last_run": None,
-            "last_results": [],
-            "last_new": [],
-            "created_at": now_iso(),
-            "updated_at": now_iso(),
-        })
-        m["enabled"] = bool(enabled)
-        if interval_hours is not None:
-            try:
-                ih = int(interval_hours)
-                if ih <= 0:
-                    ih = 12
-                m["interval_hours"] = ih
-            except Exception:
-                pass
-        m["updated_at"] = now_iso()
-        self.state["monitors"][domain] = m
-        save_json(self.file_path, self.state)
-        return m
+        with self.state_lock:
+            m = self.state.setdefault("monitors", {}).get(domain, {
+                "enabled": False,
+                "interval_hours": 12,
+                "last_run": None,
+                "last_results": [],
+                "last_new": [],
+                "created_at": now_iso(),
+                "updated_at": now_iso(),
+            })
+            m["enabled"] = bool(enabled)
+            if interval_hours is not None:
+                try:
+                    ih = int(interval_hours)
+                    if ih <= 0:
+                        ih = 12
+                    m["interval_hours"] = ih
+                except Exception:
+                    pass
+            m["updated_at"] = now_iso()
+            self.state["monitors"][domain] = m
+            save_json(self.file_path, self.state)
+            return m
 
     def delete_monitor(self, domain: str) -> bool:
         domain = domain.strip().lower()
-        monitors = self.state.get("monitors", {})
-        if domain in monitors:
-            del monitors[domain]
-            save_json(self.file_path, self.state)
-            return True
-        return False
+        with self.state_lock:
+            monitors = self.state.get("monitors", {})
+            if domain in monitors:
+                del monitors[domain]
+                save_json(self.file_path, self.state)
+                return True
+            return False
 
     def add_event(self, domain: str, new_assets: List[str]) -> None:
+        timestamp = now_iso()
         evt = {
             "type": "new_assets",
             "domain": domain,
             "count": len(new_assets),
             "new_subdomains": new_assets,
-            "timestamp": now_iso(),
+            "timestamp": timestamp,
         }
         with self.recent_lock:
             self.recent_events.append(evt)
+            self.recent_ts.append(parse_iso(timestamp).timestamp())
             if len(self.recent_events) > 200:
-                self.recent_events = self.recent_events[-200:]
+                del self.recent_events[:-200]
+                del self.recent_ts[:-200]
 
     def get_events_since(self, since_iso: Optional[str]) -> List[Dict[str, Any]]:
         with self.recent_lock:
             if not since_iso:
                 return list(self.recent_events)
             try:
-                since_dt = parse_iso(since_iso)
+                since_ts = parse_iso(since_iso).timestamp()
             except Exception:
                 return list(self.recent_events)
-            out = []
-            for e in self.recent_events:
-                try:
-                    if parse_iso(e.get("timestamp", "")) > since_dt:
-                        out.append(e)
-                except Exception:
-                    out.append(e)
-            return out
+            # Events are appended in time order; return those strictly newer.
+            return self.recent_events[bisect.bisect_right(self.recent_ts, since_ts):]
 
     def _runner(self):
         print("Monitor thread started (12h default interval).")
@@ -203,7 +448,11 @@ class MonitorManager:
         monitors = self.state.get("monitors", {})
         if not monitors:
             return
-        for domain, m in list(monitors.items()):
+        # Results are written to disk once per tick, not once per domain.
+        dirty = False
+        with self.state_lock:
+            due_list = list(monitors.items())
+        for domain, m in due_list:
             if not m.get("enabled"):
                 continue
             interval_hours = int(m.get("interval_hours", 12) or 12)
@@ -222,69 +471,180 @@ class MonitorManager:
                 continue
 
             print(f"[monitor] Running scheduled scan for {domain}")
+            # _scan_domain returns a sorted, de-duplicated list, so it can be
+            # stored as-is and filtered in order; no second set or sort.
             all_subs = self._scan_domain(domain)
             prev = set(m.get("last_results") or [])
-            found = set(all_subs)
-            new_assets = sorted(found - prev)
-
-            m["last_run"] = now_iso()
-            m["last_results"] = sorted(found)
-            m["last_new"] = new_assets
-            m["updated_at"] = now_iso()
-            self.state["monitors"][domain] = m
-            save_json(self.file_path, self.state)
+            new_assets = [sub for sub in all_subs if sub not in prev]
+
+            with self.state_lock:
+                # Deleted while the scan was running: don't resurrect it.
+                if monitors.get(domain) is not m:
+                    continue
+                m["last_run"] = now_iso()
+                m["last_results"] = all_subs
+                m["last_new"] = new_assets
+                m["updated_at"] = now_iso()
+                dirty = True
 
             if new_assets:
                 print(f"[monitor] {domain}: {len(new_assets)} new assets")
                 self.add_event(domain, new_assets)
 
+        if dirty:
+            with self.state_lock:
+                save_json(self.file_path, self.state)
+
     def _scan_domain(self, domain: str) -> List[str]:
-        crt = SubdomainAPIHandler.fetch_crt_subdomains(domain)
-        wb = SubdomainAPIHandler.fetch_wayback_subdomains(domain)
-        sf = SubdomainAPIHandler.run_subfinder(domain)
-        merged = sorted(set(crt) | set(wb) | set(sf))
-        return merged
+        # The three sources are independent and each can take tens of seconds;
+        # run them side by side on the shared upstream pool. Each one already
+        # turns its own failures into an empty list.
+        pool = SubdomainAPIHandler.upstream_pool
+        futures = [
+            pool.submit(SubdomainAPIHandler.fetch_crt_subdomains, domain),
+            pool.submit(SubdomainAPIHandler.fetch_wayback_subdomains, domain),
+            pool.submit(SubdomainAPIHandler.run_subfinder, domain),
+        ]
+        merged = set()
+        for future in futures:
+            try:
+                merged.update(future.result())
+            except Exception as e:
+                print(f"[monitor] {domain}: source failed: {e}")
+        return sorted(merged)
 
     def stop(self):
         self.stop_event.set()
         self.thread.join(timeout=3.0)
 
 
+# ---------- Background event loop ----------
+class BackgroundLoop:
+    """One long-lived asyncio event loop in a daemon thread.
+
+    Handler threads submit coroutines with run() instead of spinning up
+    (and tearing down) a fresh loop per request via asyncio.run().
+    """
+
+    def __init__(self):
+        self.loop = uvloop.new_event_loop() if uvloop is not None else asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=3.0)
+
+
+# Resolved once at startup; None when static serving is disabled.
+_static_dir_env = os.environ.get('STATIC_DIR')
+STATIC_ROOT = os.path.realpath(_static_dir_env) if _static_dir_env and os.path.isdir(_static_dir_env) else None
+
+
+@lru_cache(maxsize=128)
+def guess_content_type(ext: str) -> str:
+    content_type, _ = mimetypes.guess_type('file' + ext)
+    return content_type or 'application/octet-stream'
+
+
+CRT_CACHE_MAX_BYTES = 8 * 1024 * 1024
+
+CORS_HEADERS = (
+    ('Access-Control-Allow-Origin', '*'),
+    ('Access-Control-Allow-Methods', 'GET, POST, DELETE, OPTIONS'),
+    ('Access-Control-Allow-Headers', 'Content-Type, Authorization'),
+)
+
+# Preflight responses differ only in their Date, so their headers are fixed.
+PREFLIGHT_HEADERS = CORS_HEADERS + (('Cache-Control', 'no-store'), ('Content-Length', '0'))
+
+# Responses smaller than this are sent uncompressed; gzip overhead isn't worth it.
+GZIP_MIN_SIZE = 1024
+
+# Bodies up to this size are appended to the header block so the whole
+# response leaves in a single send(); larger ones are written separately
+# rather than copied.
+INLINE_BODY_MAX = 64 * 1024
+
+# Static files up to this size are kept in memory (see static_cache); larger
+# ones are sent from disk with sendfile.
+STATIC_CACHE_MAX_FILE = 256 * 1024
+
+DOMAIN_PARAM_RE = re.compile(r'^[a-z0-9_.-]{1,253}$')
+# Monitors are registered for apex domains only (example.com, example.co.uk).
+MONITOR_DOMAIN_RE = re.compile(r"^[a-zA-Z0-9][a-zA-Z0-9-]{0,61}[a-zA-Z0-9]?\.([a-zA-Z]{2,}|[a-zA-Z]{2,}\.[a-zA-Z]{2,})$")
+
+# Precompressed siblings (app.js.br, app.js.gz) are served in this order of
+# preference when the client accepts them; nothing is compressed per request.
+STATIC_ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+# Request bodies are drained before anything else so a keep-alive connection
+# is always left at the start of the next request; anything larger is refused.
+MAX_REQUEST_BODY = 1024 * 1024
+
+# Host part of a Wayback CDX "original" URL: optional scheme, optional
+# userinfo, then everything up to the first port/path/query delimiter.
+WAYBACK_HOST_RE = re.compile(rb'^(?:[a-z][a-z0-9+.-]*://)?(?:[^/?#@\s]*@)?([^/:?#\s]+)', re.IGNORECASE)
+
+
 # ---------- HTTP Handler ----------
 class SubdomainAPIHandler(BaseHTTPRequestHandler):
     auth_manager = AuthManager()
     monitor_mgr = MonitorManager(handler_cls_ref=None)  # set later after class definition
+    meta_loop = BackgroundLoop()
+
+    # Keep-alive: the UI fires many small API calls at this server, so reuse
+    # the connection instead of paying a TCP handshake for each one. Every
+    # response is delimited by Content-Length or chunked encoding, and idle
+    # connections are dropped after `timeout` seconds so they don't pin threads.
+    protocol_version = 'HTTP/1.1'
+    timeout = 30
+    # On a kept-alive connection Nagle would hold back the small tail of a
+    # response (e.g. the last chunk of a streamed crt.sh body) until the
+    # client's delayed ACK arrives.
+    disable_nagle_algorithm = True
 
     # ------------- Request entry points -------------
     def do_OPTIONS(self):
-        self.send_response(200)
-        self._cors()
-        self._std_headers()
-        self.end_headers()
+        if not self._drain_request_body():
+            return
+        self._write_response(200, list(PREFLIGHT_HEADERS), b'')
 
     def do_GET(self):
+        if not self._drain_request_body():
+            return
         if not self._enforce_auth():
             return
         parsed_path = urlparse(self.path)
 
         if parsed_path.path == '/api/crt':
-            return self.handle_crt_api(parsed_path)
+            return self._with_upstream_slot(self.handle_crt_api, parsed_path)
         if parsed_path.path == '/api/wayback':
-            return self.handle_wayback_api(parsed_path)
+            return self._with_upstream_slot(self.handle_wayback_api, parsed_path)
         if parsed_path.path == '/api/subfinder':
-            return self.handle_subfinder_api(parsed_path)
+            return self._with_upstream_slot(self.handle_subfinder_api, parsed_path)
+        if parsed_path.path == '/api/enum':
+            return self._with_upstream_slot(self.handle_enum_api, parsed_path)
         if parsed_path.path == '/api/monitor':
             return self.handle_monitor_get(parsed_path)
         if parsed_path.path == '/api/monitor/updates':
             return self.handle_monitor_updates_get(parsed_path)
 
-        static_dir = os.environ.get('STATIC_DIR')
-        if static_dir and os.path.isdir(static_dir):
-            return self.handle_static_file(parsed_path, static_dir)
+        if STATIC_ROOT:
+            return self.handle_static_file(parsed_path, STATIC_ROOT)
 
         self.send_error(404, "Not found")
 
     def do_POST(self):
+        if not self._drain_request_body():
+            return
         if not self._enforce_auth():
             return
         parsed_path = urlparse(self.path)
@@ -292,13 +652,11 @@ class SubdomainAPIHandler(BaseHTTPRequestHandler):
             return self.handle_meta_api()
         if parsed_path.path == '/api/monitor':
             return self.handle_monitor_post()
-        self.send_response(404)
-        self._cors()
-        self._std_headers()
-        self.end_headers()
-        self.wfile.write(b'{"error":"API endpoint not found"}')
+        self._send_body(b'{"error":"API endpoint not found"}', status=404)
 
     def do_DELETE(self):
+        if not self._drain_request_body():
+            return
         if not self._enforce_auth():
             return
         parsed_path = urlparse(self.path)
@@ -306,6 +664,18 @@ class SubdomainAPIHandler(BaseHTTPRequestHandler):
             return self.handle_monitor_delete(parsed_path)
         self.send_error(404, "Not found")
 
+    upstream_slots = threading.BoundedSemaphore(UPSTREAM_MAX_INFLIGHT)
+
+    def _with_upstream_slot(self, handler, parsed_path):
+        if not self.upstream_slots.acquire(blocking=False):
+            self._send_body(b'{"error":"Server busy; retry shortly"}', status=503,
+                            extra_headers={"Retry-After": "5"})
+            return
+        try:
+            handler(parsed_path)
+        finally:
+            self.upstream_slots.release()
+
     # ------------- Auth/CORS/Headers helpers -------------
     def _enforce_auth(self) -> bool:
         if self.command == "OPTIONS":
@@ -313,167 +683,403 @@ class SubdomainAPIHandler(BaseHTTPRequestHandler):
         ok = self.auth_manager.check_basic(self.headers.get("Authorization"))
         if ok:
             return True
-        self.send_response(401)
-        self._cors()
-        self.send_header("WWW-Authenticate", 'Basic realm="ASM"')
-        self._std_headers()
-        self.end_headers()
-        self.wfile.write(b'{"error":"Unauthorized"}')
+        self._send_body(b'{"error":"Unauthorized"}', status=401,
+                        extra_headers={"WWW-Authenticate": 'Basic realm="ASM"'})
         return False
 
     def _cors(self):
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'GET, POST, DELETE, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type, Authorization')
+        for name, value in CORS_HEADERS:
+            self.send_header(name, value)
 
     def _std_headers(self):
         self.send_header('Cache-Control', 'no-store')
 
+    def _drain_request_body(self) -> bool:
+        """Consume the request body (any method) so the next request on a
+        kept-alive connection starts cleanly; False after answering an error."""
+        # Chunked (or otherwise encoded) request bodies aren't supported;
+        # refuse them rather than leave unread bytes on the connection.
+        # send_error() also closes the connection.
+        if self.headers.get('Transfer-Encoding'):
+            self.send_error(411, "Transfer-Encoding not supported; send Content-Length")
+            return False
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self.send_error(400, "Invalid Content-Length")
+            return False
+        if length > MAX_REQUEST_BODY:
+            self.send_error(413, "Request body too large")
+            return False
+        self.request_body = self.rfile.read(length) if length else b''
+        return True
+
+    def _require_domain(self, parsed_path) -> Optional[str]:
+        """The ?domain= parameter, or None after answering 400."""
+        domain = query_param(parsed_path.query, 'domain').strip().lower()
+        if not domain:
+            self.send_error(400, "Missing domain parameter")
+            return None
+        # The value is pasted into upstream URLs; don't let it add parameters.
+        if not DOMAIN_PARAM_RE.match(domain):
+            self.send_error(400, "Invalid domain parameter")
+            return None
+        return domain
+
+    def _read_json_body(self) -> Dict[str, Any]:
+        body = self.request_body
+        payload = json_loads(body) if body.strip() else {}
+        if not isinstance(payload, dict):
+            raise ValueError("JSON body must be an object")
+        return payload
+
+    def _not_modified(self, etag: str, mtime: float) -> bool:
+        # If-None-Match wins over If-Modified-Since when both are sent (RFC 9110).
+        inm = self.headers.get('If-None-Match')
+        if inm is not None:
+            tags = [t.strip() for t in inm.split(',')]
+            return '*' in tags or etag in tags or f'W/{etag}' in tags
+        ims = self.headers.get('If-Modified-Since')
+        if not ims:
+            return False
+        try:
+            since = email.utils.parsedate_to_datetime(ims)
+        except (TypeError, ValueError, IndexError, OverflowError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        # HTTP dates have one-second resolution.
+        return int(mtime) <= since.timestamp()
+
+    def _accepts_encoding(self, coding: str) -> bool:
+        # An explicit q=0 refuses a coding, even when '*' would allow it.
+        prefs = parse_accept_encoding(self.headers.get('Accept-Encoding'))
+        return prefs.get(coding, prefs.get('*', 0.0)) > 0
+
+    def _accepts_gzip(self) -> bool:
+        return self._accepts_encoding('gzip')
+
+    def _send_body(self, data: bytes, content_type: str = 'application/json', status: int = 200,
+                   extra_headers: Optional[Dict[str, str]] = None):
+        """Send a complete response with Content-Length, gzipped when the client allows it."""
+        gzipped = False
+        if len(data) >= GZIP_MIN_SIZE and self._accepts_gzip():
+            data = gzip.compress(data, compresslevel=5)
+            gzipped = True
+        headers = list(CORS_HEADERS)
+        headers.append(('Cache-Control', 'no-store'))
+        headers.append(('Content-Type', content_type))
+        headers.append(('Vary', 'Accept-Encoding'))
+        headers.extend((extra_headers or {}).items())
+        if gzipped:
+            headers.append(('Content-Encoding', 'gzip'))
+        headers.append(('Content-Length', str(len(data))))
+        self._write_response(status, headers, data)
+
+    def _write_response(self, status: int, headers: List[Tuple[str, str]], data: bytes):
+        """Send a complete response, as a single send() when data is small.
+
+        The header block is rendered here rather than through send_header(),
+        so the body can share its write.
+        """
+        self.log_request(status)
+        if self.request_version == 'HTTP/0.9':
+            self.wfile.write(data)
+            return
+        head = [f"{self.protocol_version} {status} {self.responses.get(status, ('',))[0]}\r\n",
+                f"Server: {self.version_string()}\r\n",
+                f"Date: {self.date_time_string()}\r\n"]
+        head.extend(f"{name}: {value}\r\n" for name, value in headers)
+        head.append("\r\n")
+        block = ''.join(head).encode('latin-1', 'strict')
+        if len(data) <= INLINE_BODY_MAX:
+            self.wfile.write(block + data)
+        else:
+            self.wfile.write(block)
+            self.wfile.write(data)
+
     # ------------- Static files -------------
-    def handle_static_file(self, parsed_path, static_dir):
+    def handle_static_file(self, parsed_path, static_root):
         try:
             file_path = parsed_path.path.lstrip('/')
             if not file_path or file_path == '/':
                 file_path = 'index.html'
-            full_path = os.path.join(static_dir, file_path)
-            if not os.path.abspath(full_path).startswith(os.path.abspath(static_dir)):
+            # Compare whole path components: a plain prefix test would let
+            # /srv/www-evil through for a root of /srv/www. realpath also
+            # resolves symlinks pointing outside the root.
+            full_path = os.path.realpath(os.path.join(static_root, file_path))
+            if os.path.commonpath((full_path, static_root)) != static_root:
                 self.send_error(403, "Access denied")
                 return
-            if os.path.isfile(full_path):
-                content_type, _ = mimetypes.guess_type(full_path)
-                if not content_type:
-                    content_type = 'application/octet-stream'
-                with open(full_path, 'rb') as f:
-                    content = f.read()
-                self.send_response(200)
-                self._cors()
-                self._std_headers()
-                self.send_header('Content-Type', content_type)
-                self.send_header('Content-Length', str(len(content)))
-                self.end_headers()
-                self.wfile.write(content)
-            else:
+            st, data = self._load_static(full_path)
+            if st is None:
                 self.send_error(404, "File not found")
+                return
+            content_type = guess_content_type(os.path.splitext(full_path)[1].lower())
+            encoding = None
+            for coding, suffix in STATIC_ENCODINGS:
+                if not self._accepts_encoding(coding):
+                    continue
+                # Siblings get the same containment check as the file itself,
+                # so a .br/.gz symlink can't point outside the root either.
+                sibling_path = os.path.realpath(full_path + suffix)
+                if os.path.commonpath((sibling_path, static_root)) != static_root:
+                    continue
+                sibling_st, sibling_data = self._load_static(sibling_path)
+                if sibling_st is not None:
+                    full_path = sibling_path
+                    st, data, encoding = sibling_st, sibling_data, coding
+                    break
+            with (open(full_path, 'rb') if data is None else nullcontext()) as f:
+                if f is not None:
+                    st = os.fstat(f.fileno())
+                size = st.st_size if data is None else len(data)
+                etag = f'"{st.st_mtime_ns:x}-{size:x}"'
+                if self._not_modified(etag, st.st_mtime):
+                    self.send_response(304)
+                    self._cors()
+                    self.send_header('Cache-Control', 'no-cache')
+                    self.send_header('ETag', etag)
+                    self.send_header('Vary', 'Accept-Encoding')
+                    self.end_headers()
+                    return
+                headers = list(CORS_HEADERS)
+                # Unversioned assets (script.js etc.): let the browser keep
+                # them but revalidate each time, which is a cheap 304.
+                headers.append(('Cache-Control', 'no-cache'))
+                headers.append(('ETag', etag))
+                headers.append(('Last-Modified', self.date_time_string(st.st_mtime)))
+                headers.append(('Content-Type', content_type))
+                headers.append(('Vary', 'Accept-Encoding'))
+                if encoding:
+                    headers.append(('Content-Encoding', encoding))
+                headers.append(('Content-Length', str(size)))
+                if f is None:
+                    self._write_response(200, headers, data)
+                else:
+                    self.send_response(200)
+                    for name, value in headers:
+                        self.send_header(name, value)
+                    self.end_headers()
+                    # Zero-copy where the platform has sendfile(2); socket.sendfile
+                    # falls back to a plain read/send loop elsewhere.
+                    self.wfile.flush()
+                    self.connection.sendfile(f, 0, size)
         except Exception as e:
             print(f"Error serving static file: {e}")
             self.send_error(500, f"Error serving file: {str(e)}")
 
+    # Hot UI assets are answered from memory; an entry is re-read from disk at
+    # most every two seconds, so edits still show up almost immediately.
+    static_cache = TTLCache(2.0, max_entries=128)
+    # Misses (mostly absent .br/.gz siblings) live apart, so a stream of
+    # random 404 paths can't evict the hot assets above.
+    static_miss_cache = TTLCache(2.0, max_entries=64)
+
+    def _load_static(self, path: str) -> Tuple[Optional[os.stat_result], Optional[bytes]]:
+        """Return (stat, contents) for a regular file, (None, None) if there is none.
+
+        contents is None for files larger than STATIC_CACHE_MAX_FILE.
+        """
+        cached = self.static_cache.get(path) or self.static_miss_cache.get(path)
+        if cached is not None:
+            return cached
+        entry = (None, None)
+        try:
+            # stat first: open() would block on a FIFO.
+            if stat.S_ISREG(os.stat(path).st_mode):
+                with open(path, 'rb') as f:
+                    st = os.fstat(f.fileno())
+                    data = f.read(st.st_size) if st.st_size <= STATIC_CACHE_MAX_FILE else None
+                entry = (st, data)
+        except OSError:
+            pass
+        if entry[0] is None:
+            self.static_miss_cache.set(path, entry)
+        else:
+            self.static_cache.set(path, entry)
+        return entry
+
     # ------------- Subdomain sources -------------
+    # crt.sh bodies can be tens of MB, hence the small entry cap; streamed
+    # /api/crt responses larger than CRT_CACHE_MAX_BYTES are not cached at all.
+    upstream_cache = TTLCache(float(os.environ.get('CACHE_TTL', '900')), max_entries=64)
+    upstream_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="upstream")
+
     def handle_crt_api(self, parsed_path):
         try:
-            query_params = parse_qs(parsed_path.query)
-            domain = (query_params.get('domain', [None])[0] or "").strip().lower()
-            if not domain:
-                self.send_error(400, "Missing domain parameter")
+            domain = self._require_domain(parsed_path)
+            if domain is None:
                 return
 
-            data = self.fetch_crt_raw(domain)
-            self.send_response(200)
-            self._cors()
-            self._std_headers()
-            self.send_header('Content-Type', 'application/json')
-            self.end_headers()
-            self.wfile.write(data)
+            if query_param(parsed_path.query, 'dedup').strip().lower() in ('1', 'true', 'yes'):
+                # Popular domains return tens of MB of certificate rows repeating
+                # the same SANs; send only the unique hostnames instead.
+                self._send_body(json_bytes(self.fetch_crt_subdomains(domain)))
+                return
+
+            cached = self.upstream_cache.get(('crt', domain))
+            if cached is not None:
+                self._send_body(cached)
+            else:
+                self._stream_crt(domain)
         except Exception as e:
             print(f"Error in crt handler: {e}")
             self.send_error(500, f"Error: {str(e)}")
 
-    @staticmethod
-    def fetch_crt_raw(domain: str) -> bytes:
+    def _stream_crt(self, domain: str):
+        """Proxy crt.sh to the client chunk by chunk instead of buffering the whole body."""
         crt_url = f"https://crt.sh/?q=%.{domain}&output=json"
+        headers_sent = False
+        kept, size = [], 0
         try:
-            ssl_context = ssl.create_default_context()
-            with urllib.request.urlopen(crt_url, context=ssl_context) as response:
-                return response.read()
+            with upstream_stream(crt_url) as chunks:
+                compressor = zlib.compressobj(5, zlib.DEFLATED, 31) if self._accepts_gzip() else None
+                self.send_response(200)
+                self._cors()
+                self._std_headers()
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Vary', 'Accept-Encoding')
+                if compressor:
+                    self.send_header('Content-Encoding', 'gzip')
+                # The length isn't known up front: HTTP/1.1 clients get a
+                # chunked body and keep the connection, HTTP/1.0 clients get
+                # a body delimited by closing the connection.
+                chunked = self.request_version == 'HTTP/1.1'
+                if chunked:
+                    self.send_header('Transfer-Encoding', 'chunked')
+                else:
+                    self.send_header('Connection', 'close')
+                    self.close_connection = True
+                self.end_headers()
+                headers_sent = True
+
+                def emit(data: bytes):
+                    if not data:
+                        return
+                    if chunked:
+                        self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+                    else:
+                        self.wfile.write(data)
+
+                for chunk in chunks:
+                    emit(compressor.compress(chunk) if compressor else chunk)
+                    if kept is not None:
+                        kept.append(chunk)
+                        size += len(chunk)
+                        if size > CRT_CACHE_MAX_BYTES:
+                            kept = None
+                if compressor:
+                    emit(compressor.flush())
+                if chunked:
+                    self.wfile.write(b'0\r\n\r\n')
         except Exception as api_error:
             print(f"Error calling crt.sh API: {api_error}")
-            return json.dumps([]).encode('utf-8')
+            if not headers_sent:
+                self._send_body(b'[]')
+            else:
+                # A truncated body can't be terminated cleanly; drop the
+                # connection so the client sees the failure.
+                self.close_connection = True
+            return
+        if kept is not None:
+            self.upstream_cache.set(('crt', domain), b''.join(kept))
 
     @staticmethod
     def fetch_crt_subdomains(domain: str) -> List[str]:
-        raw = SubdomainAPIHandler.fetch_crt_raw(domain)
-        try:
-            data = json.loads(raw.decode("utf-8", "ignore"))
-        except Exception:
-            data = []
+        cached = SubdomainAPIHandler.upstream_cache.get(('crt-names', domain))
+        if cached is not None:
+            return list(cached)
+        # Reuse a raw body already cached by /api/crt; otherwise parse crt.sh
+        # as it streams in, so the (often tens of MB) body is never held whole.
+        raw = SubdomainAPIHandler.upstream_cache.get(('crt', domain))
+        crt_url = f"https://crt.sh/?q=%.{domain}&output=json"
+        suffix = "." + domain
         subs = set()
-        for cert in data:
-            try:
-                names = (cert.get("name_value") or "").split("\n")
-                for name in names:
-                    n = name.strip().lower()
-                    if n and (n == domain or n.endswith("." + domain)):
-                        subs.add(n)
-            except Exception:
-                continue
-        return sorted(subs)
+        complete = False
+        try:
+            with (nullcontext((raw,)) if raw is not None else upstream_stream(crt_url)) as chunks:
+                certs = iter_json_array(chunks)
+                names = (name.strip().lower()
+                         for cert in certs if isinstance(cert, dict)
+                         for name in str(cert.get("name_value") or "").split("\n"))
+                # set.update keeps whatever was added before an error.
+                subs.update(n for n in names if n == domain or n.endswith(suffix))
+            complete = True
+        except ValueError as e:
+            print(f"Error parsing crt.sh response: {e}")
+        except Exception as api_error:
+            print(f"Error calling crt.sh API: {api_error}")
+        result = sorted(subs)
+        if complete:
+            SubdomainAPIHandler.upstream_cache.set(('crt-names', domain), result)
+        return result
 
     def handle_wayback_api(self, parsed_path):
         try:
-            query_params = parse_qs(parsed_path.query)
-            domain = (query_params.get('domain', [None])[0] or "").strip().lower()
-            if not domain:
-                self.send_error(400, "Missing domain parameter")
+            domain = self._require_domain(parsed_path)
+            if domain is None:
                 return
             subs = self.fetch_wayback_subdomains(domain)
-            payload = json.dumps(subs).encode('utf-8')
-            self.send_response(200)
-            self._cors()
-            self._std_headers()
-            self.send_header('Content-Type', 'application/json')
-            self.end_headers()
-            self.wfile.write(payload)
+            self._send_body(json_bytes(subs))
         except Exception as e:
             print(f"Error in Wayback handler: {e}")
             self.send_error(500, f"Error: {str(e)}")
 
     @staticmethod
     def fetch_wayback_subdomains(domain: str) -> List[str]:
+        cached = SubdomainAPIHandler.upstream_cache.get(('wayback', domain))
+        if cached is not None:
+            return list(cached)
         url = ("https://web.archive.org/cdx/search/cdx"
                f"?url=*.{domain}&fl=original&collapse=urlkey")
+        # Work on the raw bytes as they arrive: the CDX body can be many MB,
+        # but only the (much smaller) set of matching hosts is kept, and only
+        # those are ever decoded.
+        dom = domain.encode('utf-8')
+        suffix = b"." + dom
+        match_host = WAYBACK_HOST_RE.match
+        hosts = set()
+        add_host = hosts.add
         try:
-            ssl_context = ssl.create_default_context()
-            with urllib.request.urlopen(url, context=ssl_context) as response:
-                raw = response.read().decode('utf-8', errors='ignore')
+            with upstream_stream(url) as chunks:
+                for line in iter_lines(chunks):
+                    m = match_host(line.strip())
+                    if not m:
+                        continue
+                    host = m.group(1).lower()
+                    if host == dom or host.endswith(suffix):
+                        add_host(host)
         except Exception as api_error:
             print(f"Error calling Wayback CDX API: {api_error}")
-            raw = ""
-        lines = [ln.strip() for ln in raw.splitlines() if ln.strip()]
-        hosts = set()
-        for line in lines:
-            try:
-                parsed = urlparse(line if '://' in line else 'http://' + line)
-                host = parsed.netloc.split('@')[-1].split(':')[0].lower()
-                if host and (host == domain or host.endswith("." + domain)):
-                    hosts.add(host)
-            except Exception:
-                continue
-        return sorted(hosts)
+            return []
+        result = sorted({h.decode('utf-8', errors='ignore') for h in hosts})
+        SubdomainAPIHandler.upstream_cache.set(('wayback', domain), result)
+        return result
 
     def handle_subfinder_api(self, parsed_path):
         try:
-            query_params = parse_qs(parsed_path.query)
-            domain = (query_params.get('domain', [None])[0] or "").strip().lower()
-            if not domain:
-                self.send_error(400, "Missing domain parameter")
+            domain = self._require_domain(parsed_path)
+            if domain is None:
                 return
             result = self.run_subfinder(domain)
-            payload = json.dumps(result).encode('utf-8')
-            self.send_response(200)
-            self._cors()
-            self._std_headers()
-            self.send_header('Content-Type', 'application/json')
-            self.end_headers()
-            self.wfile.write(payload)
+            self._send_body(json_bytes(result))
         except Exception as e:
             print(f"Error in Subfinder handler: {e}")
             self.send_error(500, f"Error: {str(e)}")
 
+    subfinder_cache = TTLCache(float(os.environ.get('SUBFINDER_TTL', '600')))
+
     @staticmethod
     def run_subfinder(domain: str) -> List[str]:
         subfinder_bin = os.environ.get('SUBFINDER_BIN', 'subfinder')
         if not shutil.which(subfinder_bin):
             return []
+        cached = SubdomainAPIHandler.subfinder_cache.get(domain)
+        if cached is not None:
+            return list(cached)
         try:
             proc = subprocess.run(
                 [subfinder_bin, '-silent', '-d', domain],
@@ -483,15 +1089,16 @@ class SubdomainAPIHandler(BaseHTTPRequestHandler):
             )
             if proc.returncode != 0:
                 print(f"Subfinder exited with {proc.returncode}: {proc.stderr.strip()}")
-            lines = [ln.strip().lower() for ln in proc.stdout.splitlines() if ln.strip()]
-            out, seen = [], set()
-            for h in lines:
-                host = h.split('@')[-1].split(':')[0]
-                if host and (host == domain or host.endswith("." + domain)):
-                    if host not in seen:
-                        seen.add(host)
-                        out.append(host)
-            return sorted(out)
+            suffix = "." + domain
+            seen = set()
+            for line in proc.stdout.splitlines():
+                host = line.strip().lower().rpartition('@')[2].partition(':')[0]
+                if host and (host == domain or host.endswith(suffix)):
+                    seen.add(host)
+            result = sorted(seen)
+            if proc.returncode == 0:
+                SubdomainAPIHandler.subfinder_cache.set(domain, result)
+            return result
         except subprocess.TimeoutExpired:
             print("Subfinder timed out.")
             return []
@@ -499,26 +1106,34 @@ class SubdomainAPIHandler(BaseHTTPRequestHandler):
             print(f"Error running subfinder: {e}")
             return []
 
+    def handle_enum_api(self, parsed_path):
+        try:
+            domain = self._require_domain(parsed_path)
+            if domain is None:
+                return
+            # Both upstreams are slow and independent; overlap them so the
+            # response takes max(crt, wayback) rather than the sum.
+            crt_future = self.upstream_pool.submit(self.fetch_crt_subdomains, domain)
+            wb_future = self.upstream_pool.submit(self.fetch_wayback_subdomains, domain)
+            merged = set(crt_future.result())
+            merged.update(wb_future.result())
+            self._send_body(json_bytes(sorted(merged)))
+        except Exception as e:
+            print(f"Error in enum handler: {e}")
+            self.send_error(500, f"Error: {str(e)}")
+
     # ------------- Monitor endpoints -------------
     def handle_monitor_get(self, parsed_path):
-        params = parse_qs(parsed_path.query)
-        domain = (params.get("domain", [None])[0] or "").strip().lower()
-        self.send_response(200)
-        self._cors()
-        self._std_headers()
-        self.send_header('Content-Type', 'application/json')
-        self.end_headers()
+        domain = query_param(parsed_path.query, "domain").strip().lower()
         if domain:
             m = self.monitor_mgr.get_monitor(domain) or {}
-            self.wfile.write(json.dumps(m).encode("utf-8"))
+            self._send_body(json_bytes(m))
         else:
-            self.wfile.write(json.dumps({"monitors": self.monitor_mgr.list_monitors()}).encode("utf-8"))
+            self._send_body(json_bytes({"monitors": self.monitor_mgr.list_monitors()}))
 
     def handle_monitor_post(self):
         try:
-            length = int(self.headers.get('Content-Length') or 0)
-            body = self.rfile.read(length) if length > 0 else b'{}'
-            payload = json.loads(body.decode('utf-8') or '{}')
+            payload = self._read_json_body()
         except Exception:
             self.send_error(400, "Invalid JSON")
         else:
@@ -528,96 +1143,61 @@ class SubdomainAPIHandler(BaseHTTPRequestHandler):
             if not domain:
                 self.send_error(400, "Missing domain")
                 return
-            if not re.match(r"^[a-zA-Z0-9][a-zA-Z0-9-]{0,61}[a-zA-Z0-9]?\.([a-zA-Z]{2,}|[a-zA-Z]{2,}\.[a-zA-Z]{2,})$", domain):
+            if not MONITOR_DOMAIN_RE.match(domain):
                 self.send_error(400, "Invalid domain")
                 return
             m = self.monitor_mgr.set_monitor(domain, enabled, interval_hours)
-            self.send_response(200)
-            self._cors()
-            self._std_headers()
-            self.send_header('Content-Type', 'application/json')
-            self.end_headers()
-            self.wfile.write(json.dumps(m).encode("utf-8"))
+            self._send_body(json_bytes(m))
 
     def handle_monitor_delete(self, parsed_path):
-        params = parse_qs(parsed_path.query)
-        domain = (params.get("domain", [None])[0] or "").strip().lower()
+        domain = query_param(parsed_path.query, "domain").strip().lower()
         if not domain:
             self.send_error(400, "Missing domain")
             return
         ok = self.monitor_mgr.delete_monitor(domain)
-        self.send_response(200 if ok else 404)
-        self._cors()
-        self._std_headers()
-        self.send_header('Content-Type', 'application/json')
-        self.end_headers()
-        self.wfile.write(json.dumps({"deleted": bool(ok)}).encode("utf-8"))
+        self._send_body(json_bytes({"deleted": bool(ok)}), status=200 if ok else 404)
 
     def handle_monitor_updates_get(self, parsed_path):
-        params = parse_qs(parsed_path.query)
-        since = (params.get("since", [None])[0] or "").strip() or None
+        since = query_param(parsed_path.query, "since").strip() or None
         events = self.monitor_mgr.get_events_since(since)
         payload = {
             "server_time": now_iso(),
             "events": events
         }
-        self.send_response(200)
-        self._cors()
-        self._std_headers()
-        self.send_header('Content-Type', 'application/json')
-        self.end_headers()
-        self.wfile.write(json.dumps(payload).encode("utf-8"))
+        self._send_body(json_bytes(payload))
 
     # ------------- Metadata + fingerprint endpoint -------------
     def handle_meta_api(self):
         if httpx is None:
-            self.send_response(500)
-            self._cors()
-            self._std_headers()
-            self.send_header('Content-Type', 'application/json')
-            self.end_headers()
-            self.wfile.write(b'{"error":"httpx is not installed on server"}')
+            self._send_body(b'{"error":"httpx is not installed on server"}', status=500)
             return
 
         try:
-            length = int(self.headers.get('Content-Length') or 0)
-            body = self.rfile.read(length) if length > 0 else b'{}'
-            payload = json.loads(body.decode('utf-8') or '{}')
+            payload = self._read_json_body()
         except Exception as e:
-            self.send_response(400)
-            self._cors()
-            self._std_headers()
-            self.send_header('Content-Type', 'application/json')
-            self.end_headers()
-            self.wfile.write(json.dumps({"error": f"Invalid JSON payload: {e}"}).encode('utf-8'))
+            self._send_body(json_bytes({"error": f"Invalid JSON payload: {e}"}), status=400)
             return
 
         hosts = payload.get('hosts', [])
         timeout_ms = payload.get('timeout_ms', 4000)
+        fingerprint = payload.get('fingerprint', True) is not False
 
         if not isinstance(hosts, list) or not hosts:
-            self.send_response(400)
-            self._cors()
-            self._std_headers()
-            self.send_header('Content-Type', 'application/json')
-            self.end_headers()
-            self.wfile.write(b'{"error":"Provide a non-empty hosts array"}')
+            self._send_body(b'{"error":"Provide a non-empty hosts array"}', status=400)
             return
 
         if len(hosts) > 200:
-            self.send_response(400)
-            self._cors()
-            self._std_headers()
-            self.send_header('Content-Type', 'application/json')
-            self.end_headers()
-            self.wfile.write(b'{"error":"Too many hosts; max 200 per request"}')
+            self._send_body(b'{"error":"Too many hosts; max 200 per request"}', status=400)
             return
 
         ordered_hosts = []
         seen = set()
         for h in hosts:
-            if isinstance(h, str):
-                h = h.strip().lower()
+            # Anything but a string can't name a host (and would break the
+            # per-domain grouping), so it is dropped like an empty entry.
+            if not isinstance(h, str):
+                continue
+            h = h.strip().lower()
             if not h or h in seen:
                 continue
             seen.add(h)
@@ -628,29 +1208,16 @@ class SubdomainAPIHandler(BaseHTTPRequestHandler):
         except Exception:
             timeout = 4.0
 
-        try:
-            results = asyncio.run(fetch_metadata_for_hosts(ordered_hosts, timeout))
-        except RuntimeError:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            results = loop.run_until_complete(fetch_metadata_for_hosts(ordered_hosts, timeout))
-            loop.close()
-
-        order_index = {h: i for i, h in enumerate(ordered_hosts)}
-        results.sort(key=lambda r: order_index.get(r.get('host', ''), 10**9))
-
-        data = json.dumps(results).encode('utf-8')
-        self.send_response(200)
-        self._cors()
-        self._std_headers()
-        self.send_header('Content-Type', 'application/json')
-        self.send_header('Content-Length', str(len(data)))
-        self.end_headers()
-        self.wfile.write(data)
+        # Results come back in ordered_hosts order (asyncio.gather keeps it).
+        results = self.meta_loop.run(fetch_metadata_for_hosts(ordered_hosts, timeout, fingerprint))
+        self._send_body(json_bytes(results))
 
 
 # ---------- Helpers for /api/meta ----------
-TITLE_RE = re.compile(r'<title[^>]*>(.*?)</title>', re.IGNORECASE | re.DOTALL)
+# Bounded lazy capture: a page without </title> fails fast instead of
+# scanning the rest of the (up to 200 KB) body from every <title> tag.
+TITLE_RE = re.compile(r'<title\b[^>]*>(.{0,4096}?)</title>', re.IGNORECASE | re.DOTALL)
+VERSION_RE = re.compile(r'([0-9]+\.[0-9]+(?:\.[0-9]+)?)')
 META_GENERATOR_RE = re.compile(r'<meta[^>]+name=["\']generator["\'][^>]+content=["\']([^"\']+)["\']', re.I)
 JQUERY_RE = re.compile(r'jquery[^/]*\.js', re.I)
 BOOTSTRAP_RE = re.compile(r'bootstrap[^/]*\.(?:css|js)', re.I)
@@ -662,19 +1229,31 @@ WORDPRESS_RE = re.compile(r'wp-content|wordpress', re.I)
 DRUPAL_RE = re.compile(r'Drupal|drupal-settings-json', re.I)
 JOOMLA_RE = re.compile(r'Joomla!', re.I)
 
+# (literals, regex, vendor, product, evidence). Every match of `regex` contains
+# one of the lower-case `literals`, so a plain substring test can rule it out.
+HTML_MARKERS = (
+    (('jquery',), JQUERY_RE, 'jQuery', 'jQuery', "script: jquery*.js"),
+    (('bootstrap',), BOOTSTRAP_RE, 'Bootstrap', 'Bootstrap', "bootstrap .css/.js"),
+    (('awesome',), FONT_AWESOME_RE, 'Font Awesome', 'Font Awesome', "font-awesome .css/.js"),
+    (('__next_data__', 'react.createelement', 'data-reactroot'), REACT_RE, 'React', 'React', "react markers"),
+    (('ng-version=', 'angular.js'), ANGULAR_RE, 'Angular', 'Angular', "angular markers"),
+    (('data-server-rendered', 'vue'), VUE_RE, 'Vue', 'Vue', "vue markers"),
+    (('wp-content', 'wordpress'), WORDPRESS_RE, 'WordPress', 'WordPress', "wp-content/html markers"),
+    (('drupal',), DRUPAL_RE, 'Drupal', 'Drupal', "html markers"),
+    (('joomla!',), JOOMLA_RE, 'Joomla', 'Joomla!', "html markers"),
+)
+
 def extract_title_from_html(html_text: str) -> str:
-    try:
-        m = TITLE_RE.search(html_text or '')
-        if not m:
-            return ''
-        title = m.group(1)
-        title = re.sub(r'\s+', ' ', title).strip()
-        return html.unescape(title)
-    except Exception:
+    m = TITLE_RE.search(html_text or '')
+    if not m:
         return ''
+    # split() with no argument breaks on the same characters as \s and drops
+    # leading/trailing runs, so this collapses and strips in one C-level pass.
+    title = ' '.join(m.group(1).split())
+    return html.unescape(title) if '&' in title else title
 
 def _parse_version(s: str) -> str:
-    m = re.search(r'([0-9]+\.[0-9]+(?:\.[0-9]+)?)', s or '')
+    m = VERSION_RE.search(s or '')
     return m.group(1) if m else ''
 
 def fingerprint_from(headers: Dict[str, str], text: str) -> List[Dict[str, Any]]:
@@ -710,14 +1289,15 @@ def fingerprint_from(headers: Dict[str, str], text: str) -> List[Dict[str, Any]]
     if 'asp.net' in xl or 'x-aspnet-version' in H:
         add('Microsoft', 'ASP.NET', f"headers: {xpb or 'x-aspnet-version'}", _parse_version(xpb or H.get('x-aspnet-version','')))
 
-    # HTML indicators
+    # HTML indicators. Lower-case the body once and only run a regex when a
+    # literal it can't match without is present: most pages match nothing.
+    text = text or ''
+    text_low = text.lower()
     gen = ''
-    try:
-        m = META_GENERATOR_RE.search(text or '')
+    if 'generator' in text_low:
+        m = META_GENERATOR_RE.search(text)
         if m:
             gen = m.group(1)
-    except Exception:
-        pass
     if gen:
         low = gen.lower()
         if 'wordpress' in low:
@@ -730,24 +1310,9 @@ def fingerprint_from(headers: Dict[str, str], text: str) -> List[Dict[str, Any]]
             add(gen.split()[0].capitalize(), gen, f'meta generator: {gen}', _parse_version(gen))
 
     # Popular libs (very light)
-    if JQUERY_RE.search(text or ''):
-        add('jQuery', 'jQuery', "script: jquery*.js")
-    if BOOTSTRAP_RE.search(text or ''):
-        add('Bootstrap', 'Bootstrap', "bootstrap .css/.js")
-    if FONT_AWESOME_RE.search(text or ''):
-        add('Font Awesome', 'Font Awesome', "font-awesome .css/.js")
-    if REACT_RE.search(text or ''):
-        add('React', 'React', "react markers")
-    if ANGULAR_RE.search(text or ''):
-        add('Angular', 'Angular', "angular markers")
-    if VUE_RE.search(text or ''):
-        add('Vue', 'Vue', "vue markers")
-    if WORDPRESS_RE.search(text or ''):
-        add('WordPress', 'WordPress', "wp-content/html markers")
-    if DRUPAL_RE.search(text or ''):
-        add('Drupal', 'Drupal', "html markers")
-    if JOOMLA_RE.search(text or ''):
-        add('Joomla', 'Joomla!', "html markers")
+    for literals, regex, vendor, product, evidence in HTML_MARKERS:
+        if any(lit in text_low for lit in literals) and regex.search(text):
+            add(vendor, product, evidence)
 
     # Deduplicate by (vendor, product, version)
     seen = set()
@@ -759,55 +1324,206 @@ def fingerprint_from(headers: Dict[str, str], text: str) -> List[Dict[str, Any]]
             unique.append(t)
     return unique
 
-async def fetch_one_host(host: str, timeout: float) -> Dict[str, Any]:
-    headers = {
-        "User-Agent": "ASM-Scanner/1.0 (+https://github.com/iamnoone1337/ASM)",
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-        "Accept-Language": "en-US,en;q=0.8",
-        "Connection": "close",
-    }
+META_CONCURRENCY = max(1, int(os.environ.get("META_CONCURRENCY", "32")))
+# Optional extra cap on simultaneous probes per registered domain within one
+# /api/meta batch. Off (0) by default: a batch is normally the subdomains of a
+# single target, so any cap below META_CONCURRENCY throttles the whole batch.
+META_PER_DOMAIN = max(0, int(os.environ.get("META_PER_DOMAIN", "0")))
+
+# Only this much of an HTML body is downloaded for title/fingerprinting;
+# non-HTML bodies are not read at all.
+META_BODY_LIMIT = 200000
+
+META_REQUEST_HEADERS = {
+    "User-Agent": "ASM-Scanner/1.0 (+https://github.com/iamnoone1337/ASM)",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.8",
+}
+
+# The probe client gets its own context: httpx sets the ALPN list on the
+# context before each handshake, and it offers h2 here but not upstream, so
+# a context shared with _upstream_client would flip between the two.
+META_SSL_CONTEXT = ssl.create_default_context()
+
+# Shared across /api/meta calls so keep-alive connections and TLS sessions
+# survive between batches. Created lazily on the BackgroundLoop thread, which
+# is the only thread that ever touches them.
+_meta_client: Optional["httpx.AsyncClient"] = None
+_meta_semaphore: Optional[asyncio.Semaphore] = None
+
+def get_meta_client() -> "httpx.AsyncClient":
+    global _meta_client
+    if _meta_client is None:
+        # Each probe holds at most one connection at a time, so a pool the
+        # size of the semaphore never makes a probe wait for a free slot.
+        _meta_client = httpx.AsyncClient(
+            follow_redirects=True,
+            headers=META_REQUEST_HEADERS,
+            verify=META_SSL_CONTEXT,
+            # Subdomains behind the same CDN edge share one multiplexed
+            # connection instead of one handshake each.
+            http2=HTTP2_AVAILABLE,
+            # Idle connections are dropped after 4s, before the 5s idle
+            # timeout common on servers, so few stale ones get reused.
+            limits=httpx.Limits(max_connections=META_CONCURRENCY,
+                                max_keepalive_connections=META_CONCURRENCY,
+                                keepalive_expiry=4.0),
+        )
+    return _meta_client
+
+def get_meta_semaphore() -> asyncio.Semaphore:
+    global _meta_semaphore
+    if _meta_semaphore is None:
+        _meta_semaphore = asyncio.Semaphore(META_CONCURRENCY)
+    return _meta_semaphore
+
+async def close_meta_client() -> None:
+    global _meta_client
+    if _meta_client is not None:
+        await _meta_client.aclose()
+        _meta_client = None
+
+async def read_body_prefix(resp: "httpx.Response", limit: int, stop_at: Optional[bytes] = None) -> str:
+    """Read at most `limit` bytes of a streamed response and decode them.
+
+    With `stop_at` (lower-case bytes), reading also stops at the end of the
+    chunk in which that marker first appears, in any case.
+    """
+    chunks = []
+    total = 0
+    tail = b''
+    async for chunk in resp.aiter_bytes():
+        chunks.append(chunk)
+        total += len(chunk)
+        if total >= limit:
+            break
+        if stop_at is not None:
+            # Keep a short tail so a marker split across chunks is still seen.
+            window = tail + chunk.lower()
+            if stop_at in window:
+                break
+            tail = window[-len(stop_at):]
+    raw = b''.join(chunks)[:limit]
+    try:
+        return raw.decode(resp.charset_encoding or 'utf-8', errors='replace')
+    except LookupError:
+        return raw.decode('utf-8', errors='replace')
+
+def is_dns_failure(exc: BaseException) -> bool:
+    """True when the error chain bottoms out in a name-resolution failure."""
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        if isinstance(exc, socket.gaierror):
+            return True
+        seen.add(id(exc))
+        exc = exc.__cause__ or exc.__context__
+    return False
+
+def retry_after_seconds(value: Optional[str], cap: float) -> Optional[float]:
+    """Seconds to wait for a Retry-After header (delta or HTTP-date), capped; None if unusable."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isascii() and value.isdigit():
+        delay = float(value)
+    else:
+        try:
+            when = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError, IndexError, OverflowError):
+            return None
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=timezone.utc)
+        delay = (when - datetime.now(timezone.utc)).total_seconds()
+    return min(max(delay, 0.0), cap)
+
+def apex_domain(host: str) -> str:
+    """Rough registered domain (last two labels) used to group probes."""
+    return '.'.join(host.partition(':')[0].rsplit('.', 2)[-2:])
+
+async def fetch_one_host(client: "httpx.AsyncClient", host: str, timeout: float,
+                         fingerprint: bool = True,
+                         slot: Optional[asyncio.Semaphore] = None) -> Dict[str, Any]:
+    """Probe a host over https, then http. `slot`, if given, is the
+    concurrency semaphore the caller holds; it is handed back while
+    waiting out a Retry-After."""
     schemes = ["https", "http"]
     error_msg = "Unknown error"
-
-    async with httpx.AsyncClient(follow_redirects=True, headers=headers, timeout=timeout, verify=True) as client:
-        for scheme in schemes:
-            url = f"{scheme}://{host}"
-            start = time.time()
-            try:
-                resp = await client.get(url)
+    retried_429 = False
+    retried_stale = False
+
+    i = 0
+    while i < len(schemes):
+        scheme = schemes[i]
+        url = f"{scheme}://{host}"
+        start = time.time()
+        try:
+            retry_in = None
+            async with client.stream("GET", url, timeout=timeout) as resp:
                 status = resp.status_code
                 ctype = resp.headers.get('content-type', '')
                 title = ''
                 body_text = ''
-                if isinstance(ctype, str) and 'text/html' in ctype.lower():
-                    text = resp.text
-                    if len(text) > 200000:
-                        text = text[:200000]
-                    body_text = text
-                    title = extract_title_from_html(text)
-
-                techs = fingerprint_from(resp.headers, body_text)
-
-                return {
-                    "host": host,
-                    "url": url,
-                    "scheme": scheme,
-                    "status_code": int(status),
-                    "title": title,
-                    "checked_at": datetime.utcnow().strftime(ISO),
-                    "elapsed_ms": int((time.time() - start) * 1000),
-                    "error": "",
-                    "headers": {
-                        "server": resp.headers.get("server", ""),
-                        "x-powered-by": resp.headers.get("x-powered-by", ""),
-                        "content-type": resp.headers.get("content-type", "")
-                    },
-                    "technologies": techs
-                }
-            except httpx.RequestError as e:
-                error_msg = str(e)
-            except Exception as e:
-                error_msg = str(e)
+                if status == 429 and not retried_429:
+                    retry_in = retry_after_seconds(resp.headers.get('retry-after'), timeout)
+                if retry_in is None and isinstance(ctype, str) and 'text/html' in ctype.lower():
+                    # Without fingerprinting only the title is needed, which
+                    # usually ends within the first few KB.
+                    body_text = await read_body_prefix(
+                        resp, META_BODY_LIMIT, stop_at=None if fingerprint else b'</title>')
+                    title = extract_title_from_html(body_text)
+
+            if retry_in is not None:
+                # Rate limited with a usable Retry-After: wait once and try the
+                # same URL again rather than reporting the 429.
+                retried_429 = True
+                if slot is None:
+                    await asyncio.sleep(retry_in)
+                else:
+                    slot.release()
+                    try:
+                        await asyncio.sleep(retry_in)
+                    finally:
+                        await slot.acquire()
+                continue
+
+            techs = fingerprint_from(resp.headers, body_text) if fingerprint else []
+
+            return {
+                "host": host,
+                "url": url,
+                "scheme": scheme,
+                "status_code": int(status),
+                "title": title,
+                "checked_at": now_iso(),
+                "elapsed_ms": int((time.time() - start) * 1000),
+                "error": "",
+                "headers": {
+                    "server": resp.headers.get("server", ""),
+                    "x-powered-by": resp.headers.get("x-powered-by", ""),
+                    "content-type": resp.headers.get("content-type", "")
+                },
+                "technologies": techs
+            }
+        except httpx.RequestError as e:
+            error_msg = str(e) or type(e).__name__
+            # A pooled keep-alive connection the server has already closed
+            # fails like this on reuse; try the same URL once more, which
+            # goes out on a fresh connection.
+            if (isinstance(e, (httpx.ReadError, httpx.WriteError, httpx.RemoteProtocolError))
+                    and not retried_stale):
+                retried_stale = True
+                continue
+            # Only a failed connect (refused, unreachable, TLS handshake) says
+            # anything about trying plain http. A host that doesn't resolve
+            # fails the same way on both; one that accepted the connection
+            # and then timed out or misbehaved is up, and a second attempt
+            # would mostly cost another timeout.
+            if is_dns_failure(e) or not isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout)):
+                break
+        except Exception as e:
+            error_msg = str(e) or type(e).__name__
+            break
+        i += 1
 
     return {
         "host": host,
@@ -815,24 +1531,50 @@ async def fetch_one_host(host: str, timeout: float) -> Dict[str, Any]:
         "scheme": "",
         "status_code": None,
         "title": "",
-        "checked_at": datetime.utcnow().strftime(ISO),
+        "checked_at": now_iso(),
         "elapsed_ms": None,
         "error": error_msg,
         "headers": {},
         "technologies": []
     }
 
-async def fetch_metadata_for_hosts(hosts: List[str], timeout: float) -> List[Dict[str, Any]]:
-    tasks = [fetch_one_host(h, timeout) for h in hosts]
+async def fetch_metadata_for_hosts(hosts: List[str], timeout: float,
+                                   fingerprint: bool = True) -> List[Dict[str, Any]]:
+    client = get_meta_client()
+    # Cap in-flight probes across all concurrent /api/meta calls so bursts
+    # don't open hundreds of sockets (and TLS handshakes) at the same instant.
+    sem = get_meta_semaphore()
+    per_domain: Dict[str, asyncio.Semaphore] = {}
+
+    async def bounded(h: str) -> Dict[str, Any]:
+        if not META_PER_DOMAIN:
+            async with sem:
+                return await fetch_one_host(client, h, timeout, fingerprint, slot=sem)
+        apex = apex_domain(h)
+        domain_sem = per_domain.get(apex)
+        if domain_sem is None:
+            domain_sem = per_domain[apex] = asyncio.Semaphore(META_PER_DOMAIN)
+        # Per-domain first, so a throttled domain's probes don't sit on global slots.
+        async with domain_sem, sem:
+            return await fetch_one_host(client, h, timeout, fingerprint, slot=sem)
+
+    tasks = [bounded(h) for h in hosts]
     return await asyncio.gather(*tasks)
 
 
+class SubdomainHTTPServer(ThreadingHTTPServer):
+    # The stdlib default listen backlog is 5, which drops connections when the
+    # UI fires crt/wayback/subfinder/meta requests in parallel.
+    request_queue_size = 128
+    daemon_threads = True
+
+
 if __name__ == '__main__':
     host = os.environ.get('HOST', '0.0.0.0')
     port = int(os.environ.get('PORT', '8001'))
     static_dir = os.environ.get('STATIC_DIR')
 
-    httpd = ThreadingHTTPServer((host, port), SubdomainAPIHandler)
+    httpd = SubdomainHTTPServer((host, port), SubdomainAPIHandler)
     SubdomainAPIHandler.monitor_mgr.handler_cls = SubdomainAPIHandler
 
     print(f"Subdomain enumeration server running on http://{host}:{port}")
@@ -840,10 +1582,11 @@ if __name__ == '__main__':
     if SubdomainAPIHandler.auth_manager.require_auth:
         print(f"  - Using credentials from: {SubdomainAPIHandler.auth_manager.auth_file}")
     print("API Endpoints:")
-    print("  - GET  /api/crt?domain=example.com")
+    print("  - GET  /api/crt?domain=example.com[&dedup=1]")
     print("  - GET  /api/wayback?domain=example.com")
     print("  - GET  /api/subfinder?domain=example.com")
-    print('  - POST /api/meta   ({"hosts":["a.example.com"], "timeout_ms":4000})')
+    print("  - GET  /api/enum?domain=example.com          (crt.sh + Wayback, merged)")
+    print('  - POST /api/meta   ({"hosts":["a.example.com"], "timeout_ms":4000, "fingerprint":true})')
     print('  - GET  /api/monitor                              (list all)')
     print('  - GET  /api/monitor?domain=example.com           (get one)')
     print('  - POST /api/monitor   {"domain":"example.com", "enabled":true, "interval_hours":12}')
@@ -869,4 +1612,10 @@ if __name__ == '__main__':
     except KeyboardInterrupt:
         print("\nShutting down...")
         SubdomainAPIHandler.monitor_mgr.stop()
+        if httpx is not None:
+            SubdomainAPIHandler.meta_loop.run(close_meta_client())
+        SubdomainAPIHandler.meta_loop.stop()
+        SubdomainAPIHandler.upstream_pool.shutdown(wait=False)
         httpd.server_close()
+        if _upstream_client is not None:
+            _upstream_client.close()
@@ -0,0 +1,122 @@
+"""Regression tests for server.iter_json_array (the streamed crt.sh parser)."""
+
+import json
+import os
+import random
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Importing server starts the monitor thread and reads monitors.json /
+# auth.json from the working directory, so do it from an empty one.
+_tmpdir = tempfile.TemporaryDirectory()
+_cwd = os.getcwd()
+os.chdir(_tmpdir.name)
+try:
+    import server
+finally:
+    os.chdir(_cwd)
+
+
+def tearDownModule():
+    server.SubdomainAPIHandler.monitor_mgr.stop()
+    _tmpdir.cleanup()
+
+
+DOC = [
+    {"name_value": "a.example.com\n*.example.com", "id": 1234567890},
+    {"issuer": "C=US, O=Let's Encrypt, CN=R3", "escaped": "q\"uo\\te \\\" ] , [ {"},
+    {"nested": {"list": [1, [2, {"x": None}], -3.5e-2], "ok": True, "no": False}},
+    "café ☃ \U0001F600 \\u escapes",
+    12.5,
+    -7,
+    1e3,
+    None,
+    [],
+    {},
+]
+RAW = json.dumps(DOC, ensure_ascii=False, indent=1).encode('utf-8')
+
+
+def split_at(data, *points):
+    bounds = [0, *points, len(data)]
+    return [data[a:b] for a, b in zip(bounds, bounds[1:])]
+
+
+def collect(chunks):
+    """Elements yielded before any error, plus that error (or None)."""
+    out = []
+    try:
+        for item in server.iter_json_array(chunks):
+            out.append(item)
+    except ValueError as e:
+        return out, e
+    return out, None
+
+
+class IterJsonArrayTest(unittest.TestCase):
+    def test_whole_document(self):
+        self.assertEqual(list(server.iter_json_array([RAW])), DOC)
+
+    def test_every_single_split(self):
+        # Covers cuts inside strings, escapes, numbers, literals and
+        # multi-byte UTF-8 sequences.
+        for i in range(len(RAW) + 1):
+            with self.subTest(split=i):
+                self.assertEqual(list(server.iter_json_array(split_at(RAW, i))), DOC)
+
+    def test_one_byte_chunks(self):
+        chunks = [RAW[i:i + 1] for i in range(len(RAW))]
+        self.assertEqual(list(server.iter_json_array(chunks)), DOC)
+
+    def test_random_splits(self):
+        rng = random.Random(1234)
+        for _ in range(200):
+            points = sorted(rng.sample(range(1, len(RAW)), 5))
+            with self.subTest(points=points):
+                self.assertEqual(list(server.iter_json_array(split_at(RAW, *points))), DOC)
+
+    def test_number_split_across_chunks(self):
+        for chunks in ([b'[12', b'34]'], [b'[1.', b'5]'], [b'[1e', b'2]'], [b'[-', b'1]']):
+            with self.subTest(chunks=chunks):
+                self.assertEqual(list(server.iter_json_array(chunks)),
+                                 [json.loads(b''.join(chunks))[0]])
+
+    def test_empty_arrays(self):
+        for raw in (b'[]', b'  [ \n ]  ', b'\n[\r\n\t]'):
+            with self.subTest(raw=raw):
+                self.assertEqual(list(server.iter_json_array([raw])), [])
+
+    def test_not_an_array(self):
+        for raw in (b'{"a": 1}', b'"x"', b'', b'  '):
+            with self.subTest(raw=raw):
+                out, err = collect([raw])
+                self.assertEqual(out, [])
+                self.assertIsInstance(err, ValueError)
+
+    def test_malformed_yields_prefix_then_raises(self):
+        cases = {
+            b'[1, 2 3]': [1, 2],
+            b'[1, 2,]': [1, 2],
+            b'[{"a": 1}, {"a": }]': [{"a": 1}],
+            b'[1, 2.]': [1],
+        }
+        for raw, prefix in cases.items():
+            with self.subTest(raw=raw):
+                out, err = collect(split_at(raw, len(raw) // 2))
+                self.assertEqual(out, prefix)
+                self.assertIsInstance(err, ValueError)
+
+    def test_truncated(self):
+        for cut in (len(RAW) - 1, len(RAW) // 2, 1):
+            with self.subTest(cut=cut):
+                out, err = collect([RAW[:cut]])
+                self.assertEqual(out, DOC[:len(out)])
+                self.assertIsInstance(err, ValueError)
+
+
+if __name__ == '__main__':
+    unittest.main()
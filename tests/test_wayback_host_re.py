@@ -0,0 +1,67 @@
+"""Regression tests for server.WAYBACK_HOST_RE (host part of CDX "original" URLs)."""
+
+import os
+import sys
+import tempfile
+import unittest
+from urllib.parse import urlparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Importing server starts the monitor thread and reads monitors.json /
+# auth.json from the working directory, so do it from an empty one.
+_tmpdir = tempfile.TemporaryDirectory()
+_cwd = os.getcwd()
+os.chdir(_tmpdir.name)
+try:
+    import server
+finally:
+    os.chdir(_cwd)
+
+
+def tearDownModule():
+    server.SubdomainAPIHandler.monitor_mgr.stop()
+    _tmpdir.cleanup()
+
+
+def urlparse_host(line):
+    """The urlparse-based extraction WAYBACK_HOST_RE replaced."""
+    parsed = urlparse(line if '://' in line else 'http://' + line)
+    return parsed.netloc.split('@')[-1].split(':')[0].lower()
+
+
+LINES = [
+    'http://a.example.com',
+    'https://a.example.com/',
+    'http://A.Example.COM:8080/path?q=1',
+    'a.example.com/path',
+    'a.example.com:443',
+    'ftp://user:pw@a.example.com/file',
+    'http://user@a.example.com:80/x',
+    'http://a.example.com?u=me@b.example.com',
+    'http://a.example.com#x@evil.example.com',
+    'http://a.example.com/p?next=http://c.example.com',
+    'http://a.example.com/p@q/r',
+    'a.example.com?x=1@b.example.com',
+]
+
+
+class WaybackHostTest(unittest.TestCase):
+    def test_matches_urlparse(self):
+        for line in LINES:
+            with self.subTest(line=line):
+                m = server.WAYBACK_HOST_RE.match(line.encode())
+                self.assertIsNotNone(m)
+                self.assertEqual(m.group(1).decode().lower(), urlparse_host(line))
+
+    def test_at_sign_after_host_is_not_userinfo(self):
+        for line in ('http://a.example.com?u=me@b.example.com',
+                     'http://a.example.com#x@evil.example.com'):
+            with self.subTest(line=line):
+                self.assertEqual(server.WAYBACK_HOST_RE.match(line.encode()).group(1),
+                                 b'a.example.com')
+
+
+if __name__ == '__main__':
+    unittest.main()